@@ -1,5 +1,7 @@
 import sys
 
+from collections import deque
+
 from crossword import *
 
 
@@ -10,10 +12,90 @@ class CrosswordCreator():
         Create new CSP crossword generate.
         """
         self.crossword = crossword
+        # group the vocabulary by length once, so each variable's domain
+        # starts with only the words that can fit it
+        words_by_length = dict()
+        for word in self.crossword.words:
+            words_by_length.setdefault(len(word), set()).add(word)
         self.domains = {
-            var: self.crossword.words.copy()
+            var: words_by_length.get(var.length, set()).copy()
+            for var in self.crossword.variables
+        }
+        # per-variable, per-position index of the domain's words by letter
+        self.letter_words = {
+            var: self.index_letters(var)
+            for var in self.crossword.variables
+        }
+        # per-variable, per-position bitmask of the letters in the index,
+        # with bit ord(letter) set for each letter present
+        self.letter_masks = {
+            var: self.mask_letters(var)
+            for var in self.crossword.variables
+        }
+        # neighbors of each variable, computed once
+        self._neighbors = {
+            var: frozenset(self.crossword.neighbors(var))
             for var in self.crossword.variables
         }
+        # all arcs in the problem (non-None overlaps), computed once
+        self._all_arcs = tuple(
+            key for key, overlap in self.crossword.overlaps.items()
+            if overlap is not None
+        )
+
+    def index_letters(self, var):
+        """
+        Return a list with one dictionary per position of `var`, mapping each
+        letter to the set of words in `self.domains[var]` with that letter
+        at that position. Letters that do not occur are left out.
+        """
+        index = [dict() for _ in range(var.length)]
+        for word in self.domains[var]:
+            if len(word) != var.length:
+                continue
+            for k in range(var.length):
+                index[k].setdefault(word[k], set()).add(word)
+        return index
+
+    def mask_letters(self, var):
+        """
+        Return a list with one integer per position of `var`, with bit
+        ord(letter) set for each letter in `self.letter_words[var]` at that
+        position.
+        """
+        return [
+            sum(1 << ord(letter) for letter in letters)
+            for letters in self.letter_words[var]
+        ]
+
+    def remove_word(self, var, word, trail=None):
+        """
+        Remove `word` from the domain of `var`, updating the letter index.
+        If `trail` is given, record the removal on it so it can be undone.
+        """
+        self.domains[var].remove(word)
+        if trail is not None:
+            trail.append((var, word))
+        index = self.letter_words[var]
+        masks = self.letter_masks[var]
+        for k in range(var.length):
+            words = index[k][word[k]]
+            words.remove(word)
+            # drop the letter once no word in the domain has it here
+            if not words:
+                del index[k][word[k]]
+                masks[k] &= ~(1 << ord(word[k]))
+
+    def add_word(self, var, word):
+        """
+        Add `word` back to the domain of `var`, updating the letter index.
+        """
+        self.domains[var].add(word)
+        index = self.letter_words[var]
+        masks = self.letter_masks[var]
+        for k in range(var.length):
+            index[k].setdefault(word[k], set()).add(word)
+            masks[k] |= 1 << ord(word[k])
 
     def letter_grid(self, assignment):
         """
@@ -64,24 +146,42 @@ class CrosswordCreator():
         font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
         draw = ImageDraw.Draw(img)
 
+        # Paint all open cells white at once, by scaling the structure up
+        # from one pixel per cell to a mask covering the whole canvas
+        mask = Image.new("L", (self.crossword.width, self.crossword.height))
+        mask.putdata([
+            255 if cell else 0
+            for row in self.crossword.structure for cell in row
+        ])
+        img.paste("white", mask=mask.resize(img.size, Image.NEAREST))
+
+        # Paint the borders between cells black, one strip per grid line
+        for i in range(self.crossword.height + 1):
+            draw.rectangle(
+                [(0, i * cell_size - cell_border + 1),
+                 (img.width, i * cell_size + cell_border - 1)],
+                fill="black"
+            )
+        for j in range(self.crossword.width + 1):
+            draw.rectangle(
+                [(j * cell_size - cell_border + 1, 0),
+                 (j * cell_size + cell_border - 1, img.height)],
+                fill="black"
+            )
+
+        # Draw the letters of filled cells, measuring each distinct letter once
+        sizes = dict()
         for i in range(self.crossword.height):
             for j in range(self.crossword.width):
-
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
+                if self.crossword.structure[i][j] and letters[i][j]:
+                    if letters[i][j] not in sizes:
+                        sizes[letters[i][j]] = draw.textsize(letters[i][j], font=font)
+                    w, h = sizes[letters[i][j]]
+                    draw.text(
+                        (j * cell_size + cell_border + ((interior_size - w) / 2),
+                         i * cell_size + cell_border + ((interior_size - h) / 2) - 10),
+                        letters[i][j], fill="black", font=font
+                    )
 
         img.save(filename)
 
@@ -106,14 +206,17 @@ class CrosswordCreator():
             for word in self.domains[var]:
                 if var.length == len(word):
                     domain_consistent.add(word)
-            # update domain of variable
+            # update domain of variable and its letter index
             self.domains[var] = domain_consistent
+            self.letter_words[var] = self.index_letters(var)
+            self.letter_masks[var] = self.mask_letters(var)
 
-    def revise(self, x, y):
+    def revise(self, x, y, trail=None):
         """
         Make variable `x` arc consistent with variable `y`.
         To do so, remove values from `self.domains[x]` for which there is no
         possible corresponding value for `y` in `self.domains[y]`.
+        Removed values are recorded on `trail`, if given.
 
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
@@ -123,49 +226,57 @@ class CrosswordCreator():
 
         # for a given (x, y) pair with an overlap
         if overlap is not None:
-            to_remove = set()
             i = overlap[0]
             j = overlap[1]
-            # iterate through each word in domain of x
-            for word in self.domains[x]:
-                # append to set if word does not have any match in domain of y
-                if all(word[i] != other[j] for other in self.domains[y]):
-                    change = True
-                    to_remove.add(word)
+            # find the letters at position i of x with no match at position j
+            # of y; if the bitmasks show there are none, nothing needs revising
+            missing = self.letter_masks[x][i] & ~self.letter_masks[y][j]
+            if not missing:
+                return False
+            # every word of x with such a letter has to go
+            to_remove = [
+                letter for letter in self.letter_words[x][i]
+                if missing >> ord(letter) & 1
+            ]
             # remove invalid words from domain of x
-            for word in list(to_remove):
-                self.domains[x].remove(word)
+            for letter in to_remove:
+                change = True
+                for word in list(self.letter_words[x][i][letter]):
+                    self.remove_word(x, word, trail)
         return change
 
-    def ac3(self, arcs=None):
+    def ac3(self, arcs=None, trail=None):
         """
         Update `self.domains` such that each variable is arc consistent.
         If `arcs` is None, begin with initial list of all arcs in the problem.
         Otherwise, use `arcs` as the initial list of arcs to make consistent.
+        Every value removed is recorded on `trail`, if given.
 
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
         """
-        # if no arcs in argument, get list of all arcs (i.e. all overlaps)
-        # filter to list of non-None tuples
+        # if no arcs in argument, start from all arcs (i.e. all overlaps)
         if arcs is None:
-            arcs = []
-            for key in self.crossword.overlaps.keys():
-                if self.crossword.overlaps[key[0], key[1]] is not None:
-                    arcs.append(key)
+            arcs = self._all_arcs
+        # use a deque as the queue, with a set of queued arcs to skip duplicates
+        arcs = deque(arcs)
+        in_queue = set(arcs)
         while len(arcs) > 0:
-            # get first element of list (queue)
-            arc = arcs.pop(0)
+            # get first element of queue
+            arc = arcs.popleft()
+            in_queue.discard(arc)
             # if a change was made to the domain of arc[0]
-            if self.revise(arc[0], arc[1]):
+            if self.revise(arc[0], arc[1], trail):
                 # check if it now has no elements in its domain
                 if len(self.domains[arc[0]]) == 0:
                     return False
                 # otherwise, add all (Z, X) pairs to the end of the queue
-                neighbors = list(self.crossword.neighbors(arc[0]) - {arc[1]})
+                neighbors = list(self._neighbors[arc[0]] - {arc[1]})
                 if len(neighbors) >= 1:
                     for neighbor in neighbors:
-                        arcs.append((neighbor, arc[0]))
+                        if (neighbor, arc[0]) not in in_queue:
+                            arcs.append((neighbor, arc[0]))
+                            in_queue.add((neighbor, arc[0]))
         return True
 
     def assignment_complete(self, assignment):
@@ -190,7 +301,7 @@ class CrosswordCreator():
             if var.length != len(word):
                 return False
             # check all neighbors of the current variable
-            for neighbor in self.crossword.neighbors(var):
+            for neighbor in self._neighbors[var]:
                 # if a given neighbor has been assigned in the current assignment
                 if neighbor in assignment.keys():
                     overlap = self.crossword.overlaps[var, neighbor]
@@ -203,6 +314,24 @@ class CrosswordCreator():
             return False
         return True
 
+    def consistent_new(self, var, value, assignment):
+        """
+        Return True if assigning `value` to `var` is consistent with the
+        (already consistent) `assignment`; return False otherwise.
+        Only the length and overlap constraints involving `var` are checked;
+        `backtrack` checks that `value` is unused before calling this.
+        """
+        # check the length matches (this should have already been enforced by node consistency)
+        if var.length != len(value):
+            return False
+        # make sure the overlap matches for each assigned neighbor
+        for neighbor in self._neighbors[var]:
+            if neighbor in assignment:
+                overlap = self.crossword.overlaps[var, neighbor]
+                if value[overlap[0]] != assignment[neighbor][overlap[1]]:
+                    return False
+        return True
+
     def order_domain_values(self, var, assignment):
         """
         Return a list of values in the domain of `var`, in order by
@@ -210,26 +339,24 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        domain_values = list()
-        domain_list = list()
-        # for each value in the domain of the variable
-        for value in self.domains[var]:
-            # initialize a counter
+        # collect (overlap, neighbor) pairs for each unassigned neighbor
+        constraints = [
+            (self.crossword.overlaps[var, neighbor], neighbor)
+            for neighbor in self._neighbors[var]
+            if neighbor not in assignment.keys()
+        ]
+
+        def ruled_out(value):
+            # every word in the neighbor's domain without the matching letter
+            # at the overlap is forbidden, so count them from the letter index
             n = 0
-            # for each unassigned neighbor
-            for neighbor in self.crossword.neighbors(var):
-                if neighbor not in assignment.keys():
-                    # get the overlap, and iterate through each word in the neighbor's domain
-                    overlap = self.crossword.overlaps[var, neighbor]
-                    for neighbor_value in self.domains[neighbor]:
-                        # if the overlap does not match, this word is forbidden, so the counter is incremented
-                        if value[overlap[0]] != neighbor_value[overlap[1]]:
-                            n += 1
-            domain_values.append(n)
-            domain_list.append(value)
-        # sort list by n
-        sorted_list = [x for _,x in sorted(zip(domain_values, domain_list))]
-        return sorted_list
+            for overlap, neighbor in constraints:
+                matching = self.letter_words[neighbor][overlap[1]].get(value[overlap[0]], ())
+                n += len(self.domains[neighbor]) - len(matching)
+            return n
+
+        # sort list by n, breaking ties by the word itself
+        return sorted(self.domains[var], key=lambda value: (ruled_out(value), value))
 
     def select_unassigned_variable(self, assignment):
         """
@@ -249,7 +376,7 @@ class CrosswordCreator():
                 # append the variable, its MRV, and its degree
                 vars.append(var)
                 MRV.append(len(self.domains[var]))
-                degree.append(len(self.crossword.neighbors(var)))
+                degree.append(len(self._neighbors[var]))
 
         # find minimum MRV of all unassigned variables
         min_val = min(MRV)
@@ -264,47 +391,53 @@ class CrosswordCreator():
         # otherwise, return the variable with the minimum value
         return vars[MRV.index(min_val)]
 
-    def backtrack(self, assignment):
+    def backtrack(self, assignment, used=None):
         """
         Using Backtracking Search, take as input a partial assignment for the
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        `used` is the set of words in `assignment`, kept in step with it
+        across recursive calls.
 
         If no assignment is possible, return None.
         """
         # if assignment is complete, done
         if self.assignment_complete(assignment):
             return assignment
+        if used is None:
+            used = set(assignment.values())
         # select an unassigned variable
         var = self.select_unassigned_variable(assignment)
         # iterate over each of its possible word assignments, from least constraining first
         for value in self.order_domain_values(var, assignment):
-            # copy the current assignment and add the new var-value pair
-            assignment_new = assignment.copy()
-            assignment_new[var] = value
-            # if this new assignment is inconsistent, go to next iteration; otherwise
-            if self.consistent(assignment_new):
-                # record current domains prior to enforcing arc consistency with new assignment
-                domain_old = dict()
-                for var2 in self.crossword.variables:
-                    domain_old[var2] = self.domains[var2]
+            # words must be unique, so skip any already used
+            if value in used:
+                continue
+            # if adding the var-value pair is inconsistent, go to next iteration; otherwise
+            if self.consistent_new(var, value, assignment):
+                # copy the current assignment and add the new var-value pair
+                assignment_new = assignment.copy()
+                assignment_new[var] = value
+                used.add(value)
+                # log of (variable, word) removals made while enforcing arc consistency
+                trail = list()
                 # make list of (Z, X) arcs to consider with new assignment
                 arcs = list()
-                for neighbor in self.crossword.neighbors(var):
+                for neighbor in self._neighbors[var]:
                     arcs.append((neighbor, var))
                 # update domains with new assignment (Maintaining Arc-Consistency)
-                inferences = self.ac3(arcs)
-                # continue to next word if unsuccessful (i.e. if a variable has an empty domain)
-                if not inferences:
-                    continue
-                # recursively call backtrack with current assignment
-                res = self.backtrack(assignment_new)
-                if res:
-                    return res
-                # if backtrack was unsuccessful, restore domain back to previous state and continue to next word
-                for var2 in self.crossword.variables:
-                    self.domains[var2] = domain_old[var2]
+                inferences = self.ac3(arcs, trail)
+                # recursively call backtrack with current assignment, unless a variable has an empty domain
+                if inferences:
+                    res = self.backtrack(assignment_new, used)
+                    if res:
+                        return res
+                # if unsuccessful, free the word, undo the removals in reverse order and continue to next word
+                used.remove(value)
+                while trail:
+                    var2, word = trail.pop()
+                    self.add_word(var2, word)
         return None
 
 
@@ -1,5 +1,4 @@
 import csv
-import itertools
 import sys
 
 PROBS = {
@@ -36,6 +35,14 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Flat lookup tables derived from PROBS, indexed by number of gene copies
+# (and by whether the trait is present, for P_TRAIT)
+P_GENE = tuple(PROBS["gene"][n] for n in range(3))
+P_TRAIT = tuple(
+    (PROBS["trait"][n][False], PROBS["trait"][n][True])
+    for n in range(3)
+)
+
 
 def main():
 
@@ -60,26 +67,49 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    # Assign each person a bit, so that sets of people are bitmasks,
+    # and build the set of people for every bitmask once
+    names = list(people)
+    subsets = [
+        {names[i] for i in range(len(names)) if mask & (1 << i)}
+        for mask in range(1 << len(names))
+    ]
+    everyone = (1 << len(names)) - 1
+    family = family_tree(people)
+
+    # People known to have the trait must be in every set, and people known not to have it in none,
+    # so only the people with unknown trait vary
+    known_trait = 0
+    unknown_trait = 0
+    for i, person in enumerate(names):
+        if people[person]["trait"] is None:
+            unknown_trait |= 1 << i
+        elif people[person]["trait"]:
+            known_trait |= 1 << i
+
+    # Loop over all sets of people who might have the gene
+    for one_mask in range(1 << len(names)):
+        one_gene = subsets[one_mask]
+        for two_mask in submasks(everyone & ~one_mask):
+            two_genes = subsets[two_mask]
+
+            # The probability of the genes is shared by every set of people who might have the trait
+            gene_count = gene_counts(people, one_gene, two_genes)
+            p_gene = gene_probability(family, gene_count)
+
+            # Loop over all sets of people who might have the trait, consistent with known information,
+            # keeping a local total since the gene distributions get the same update for each of them
+            p_total = 0
+            for trait_mask in submasks(unknown_trait):
+                have_trait = subsets[known_trait | trait_mask]
+
+                # Update trait probabilities with new joint probability
+                p = p_gene * trait_probability(gene_count, have_trait)
+                update_trait(probabilities, have_trait, p)
+                p_total += p
+
+            # Update gene probabilities once with the total over all sets of people who might have the trait
+            update_gene(probabilities, gene_count, p_total)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
@@ -116,16 +146,16 @@ def load_data(filename):
     return data
 
 
-def powerset(s):
+def submasks(mask):
     """
-    Return a list of all possible subsets of set s.
+    Yield every subset of the bitmask `mask`, from `mask` itself down to 0.
     """
-    s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    sub = mask
+    while True:
+        yield sub
+        if sub == 0:
+            return
+        sub = (sub - 1) & mask
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -139,83 +169,112 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
+    # look up everyone's number of gene copies once, so parents are not looked up again for each child
+    gene_count = gene_counts(people, one_gene, two_genes)
+    return gene_probability(family_tree(people), gene_count) * trait_probability(gene_count, have_trait)
+
+
+def family_tree(people):
+    """
+    Return a list of (person, mother, father) tuples, with both parents set to None unless both are listed.
+    This only depends on `people`, so it can be built once and reused for every joint probability.
+    """
+    tree = list()
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None or father is None:
+            tree.append((person, None, None))
+        else:
+            tree.append((person, mother, father))
+    return tree
+
+
+def gene_probability(family, gene_count):
+    """
+    Return the probability that everyone in the list `family` (as built by `family_tree`) has the number of gene
+    copies given by the dictionary `gene_count`.
+    This does not depend on who has the trait, so it can be reused across all sets `have_trait`.
+    """
     prob = 1
     # iterate through all people
-    for person in people:
-        # if person has no listed parents
-        if people[person]["mother"] is None or people[person]["father"] is None:
-            # take their probability from the unconditional distribution, multiply by conditional probability of having
-            # the trait or not based on the genotype
-            if person in one_gene:
-                prob *= PROBS["gene"][1]
-                prob = trait_prob(prob, 1, person, have_trait)
-            elif person in two_genes:
-                prob *= PROBS["gene"][2]
-                prob = trait_prob(prob, 2, person, have_trait)
-            else:
-                prob *= PROBS["gene"][0]
-                prob = trait_prob(prob, 0, person, have_trait)
-        # otherwise, create a set of the two parent genotypes
+    for person, mother, father in family:
+        n_gene = gene_count[person]
+        # if person has no listed parents, take their probability from the unconditional distribution
+        if mother is None:
+            prob *= P_GENE[n_gene]
+        # otherwise, update probability of having the genotype of interest based on the parent genotypes
         else:
-            parents = set()
-            if people[person]["mother"] in one_gene:
-                parents.add(1)
-            elif people[person]["mother"] in two_genes:
-                parents.add(2)
-            else:
-                parents.add(0)
-
-            if people[person]["father"] in one_gene:
-                parents.add(1)
-            elif people[person]["father"] in two_genes:
-                parents.add(2)
-            else:
-                parents.add(0)
-
-            # call function first to update probability of having the genotype of interest
-            # then call function to update based on having the trait or not conditional on the genotype
-            if person in one_gene:
-                prob = inheritance(prob, 1, parents)
-                prob = trait_prob(prob, 1, person, have_trait)
-            elif person in two_genes:
-                prob = inheritance(prob, 2, parents)
-                prob = trait_prob(prob, 2, person, have_trait)
-            else:
-                prob = inheritance(prob, 0, parents)
-                prob = trait_prob(prob, 0, person, have_trait)
+            prob = inheritance(prob, n_gene, gene_count[mother], gene_count[father])
     return prob
 
 
+def trait_probability(gene_count, have_trait):
+    """
+    Return the probability that exactly the people in set `have_trait` have the trait, conditional on everyone
+    having the number of gene copies given by the dictionary `gene_count`.
+    """
+    prob = 1
+    for person, n_gene in gene_count.items():
+        prob = trait_prob(prob, n_gene, person, have_trait)
+    return prob
+
+
+def gene_counts(people, one_gene, two_genes):
+    """
+    Return a dictionary mapping each person to their number of gene copies, given the sets `one_gene` and `two_genes`
+    """
+    return {person: gene_copies(person, one_gene, two_genes) for person in people}
+
+
+def gene_copies(person, one_gene, two_genes):
+    """
+    Return the number of copies of the gene `person` has, given the sets `one_gene` and `two_genes`
+    """
+    if person in one_gene:
+        return 1
+    elif person in two_genes:
+        return 2
+    return 0
+
+
 def trait_prob(prob, n_gene, person, have_trait):
     """
     This function updates the current probability estimate by multiplying the existing estimate by the probability of
     having the gene (or not, depending on the person's presence in the have_trait set) conditional on having n_gene
     alleles of the mutated gene
     """
-    if person in have_trait:
-        prob *= PROBS["trait"][n_gene][True]
-    else:
-        prob *= PROBS["trait"][n_gene][False]
-    return prob
+    return prob * P_TRAIT[n_gene][person in have_trait]
 
 
-def inheritance(prob, n_gene, parents):
+def inheritance(prob, n_gene, mother_gene, father_gene):
     """
-    This function calculates the conditional probabilities of having the genotype of interest (n_gene copies)
-    based on the genotypes of the parents, input as the set parents
+    This function updates the current probability estimate by multiplying the existing estimate by the probability of
+    having the genotype of interest (n_gene copies) conditional on the genotypes of the parents, input as their numbers
+    of gene copies
+    """
+    return prob * INHERIT[mother_gene][father_gene][n_gene]
+
+
+def hereditary_probs(mother_gene, father_gene):
+    """
+    This function calculates the conditional probabilities of having 0, 1 or 2 copies of the gene based on the
+    genotypes of the parents, input as their numbers of gene copies, and returns them as a tuple indexed by copies
     """
     # rename constants for ease of typing; initialize dictionary to store conditional probabilities
     pmut = PROBS["mutation"]
     pnomut = 1 - pmut
     hered_prob = dict()
+    # order of the parents does not matter, so sort the pair
+    parents = (min(mother_gene, father_gene), max(mother_gene, father_gene))
 
     # go through each combination of the parental genotypes
-    if parents == {2, 2}:
+    if parents == (2, 2):
         # to get AA, must have no mutations; aa, must have two mutations; Aa, must have mutation in either allele
         hered_prob["AA"] = pnomut * pnomut
         hered_prob["Aa"] = 2 * pnomut * pmut
         hered_prob["aa"] = pmut * pmut
-    elif parents == {1, 2}:
+    elif parents == (1, 2):
         # must consider which allele the heterozygous parent gives in addition to mutations
         # AA can arise from both parents giving A or one parent giving a with a mutation;
         # aa can arise from one parent giving a and one giving A with a mutation or A and A with 2 mutations
@@ -223,7 +282,7 @@ def inheritance(prob, n_gene, parents):
         hered_prob["AA"] = 0.5 * pnomut * pnomut + 0.5 * pnomut * pmut
         hered_prob["Aa"] = 0.5 * pnomut * pnomut + pnomut * pmut + 0.5 * pmut * pmut
         hered_prob["aa"] = 0.5 * pnomut * pmut + 0.5 * pmut * pmut
-    elif parents == {1, 1}:
+    elif parents == (1, 1):
         # now we must consider the probabilities from a monohybrid cross and mutations:
         # before considering mutations, P(AA) = P(aa) = 0.25, P(Aa) = 0.5
         # AA can arise from AA with no mutations, Aa with one mutation, or aa with two mutations
@@ -232,30 +291,30 @@ def inheritance(prob, n_gene, parents):
         hered_prob["AA"] = 0.25 * pnomut * pnomut + 0.25 * pmut * pmut + 0.5 * pmut * pnomut
         hered_prob["Aa"] = 0.5 * pnomut * pnomut + 0.5 * pmut * pmut + pnomut * pmut
         hered_prob["aa"] = 0.25 * pnomut * pnomut + 0.25 * pmut * pmut + 0.5 * pmut * pnomut
-    elif parents == {1, 0}:
-        # this case is the reverse of {1, 2}
+    elif parents == (0, 1):
+        # this case is the reverse of (1, 2)
         hered_prob["AA"] = 0.5 * pnomut * pmut + 0.5 * pmut * pmut
         hered_prob["Aa"] = 0.5 * pnomut * pnomut + pnomut * pmut + 0.5 * pmut * pmut
         hered_prob["aa"] = 0.5 * pnomut * pnomut + 0.5 * pnomut * pmut
-    elif parents == {2, 0}:
+    elif parents == (0, 2):
         # for AA or aa, must have one mutation and one without mutation; for Aa, either 2 or 0 mutations
         hered_prob["AA"] = pnomut * pmut
         hered_prob["Aa"] = pnomut * pnomut + pmut * pmut
         hered_prob["aa"] = pmut * pnomut
     else:
-        # for {0, 0}, it is the reverse of {2, 2}
+        # for (0, 0), it is the reverse of (2, 2)
         hered_prob["AA"] = pmut * pmut
         hered_prob["Aa"] = 2 * pnomut * pmut
         hered_prob["aa"] = pnomut * pnomut
 
-    if n_gene == 2:
-        prob *= hered_prob["AA"]
-    elif n_gene == 1:
-        prob *= hered_prob["Aa"]
-    else:
-        prob *= hered_prob["aa"]
+    return hered_prob["aa"], hered_prob["Aa"], hered_prob["AA"]
 
-    return prob
+
+# Conditional probabilities of the child's number of gene copies, indexed as INHERIT[mother][father][child]
+INHERIT = tuple(
+    tuple(hereditary_probs(mother_gene, father_gene) for father_gene in range(3))
+    for mother_gene in range(3)
+)
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -265,20 +324,24 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
     Which value for each distribution is updated depends on whether
     the person is in `have_gene` and `have_trait`, respectively.
     """
+    update_gene(probabilities, gene_counts(probabilities, one_gene, two_genes), p)
+    update_trait(probabilities, have_trait, p)
+
+
+def update_gene(probabilities, gene_count, p):
+    """
+    Add `p` to each person's "gene" distribution, at their number of gene copies given by the dictionary `gene_count`
+    """
     for person in probabilities:
-        # update gene distribution
-        if person in one_gene:
-            probabilities[person]["gene"][1] += p
-        elif person in two_genes:
-            probabilities[person]["gene"][2] += p
-        else:
-            probabilities[person]["gene"][0] += p
+        probabilities[person]["gene"][gene_count[person]] += p
 
-        # update trait distribution
-        if person in have_trait:
-            probabilities[person]["trait"][True] += p
-        else:
-            probabilities[person]["trait"][False] += p
+
+def update_trait(probabilities, have_trait, p):
+    """
+    Add `p` to each person's "trait" distribution, depending on whether they are in set `have_trait`
+    """
+    for person in probabilities:
+        probabilities[person]["trait"][person in have_trait] += p
 
 
 def normalize(probabilities):
@@ -287,13 +350,12 @@ def normalize(probabilities):
     is normalized (i.e., sums to 1, with relative proportions the same).
     """
     for person in probabilities:
-        trait_sum = probabilities[person]["trait"][False] + probabilities[person]["trait"][True]
-        gene_sum = probabilities[person]["gene"][0] + probabilities[person]["gene"][1] + probabilities[person]["gene"][2]
-        probabilities[person]["trait"][False] /= trait_sum
-        probabilities[person]["trait"][True] /= trait_sum
-        probabilities[person]["gene"][0] /= gene_sum
-        probabilities[person]["gene"][1] /= gene_sum
-        probabilities[person]["gene"][2] /= gene_sum
+        # divide each value of the gene and trait distributions by the distribution's total
+        for distribution in probabilities[person].values():
+            total = sum(distribution.values())
+            for value in distribution:
+                distribution[value] /= total
+
 
 if __name__ == "__main__":
     main()
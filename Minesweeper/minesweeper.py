@@ -1,6 +1,8 @@
 import itertools
 import random
 
+import numpy as np
+
 
 class Minesweeper():
     """
@@ -12,23 +14,17 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
         # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        self.board = np.zeros((height, width), dtype=bool)
+
+        # Add mines randomly, drawing distinct cells all at once
+        rows, cols = np.unravel_index(
+            np.random.choice(height * width, mines, replace=False),
+            (height, width)
+        )
+        self.board[rows, cols] = True
+        self.mines = set(zip(rows.tolist(), cols.tolist()))
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -38,19 +34,13 @@ class Minesweeper():
         Prints a text-based representation
         of where mines are located.
         """
-        for i in range(self.height):
+        for row in np.where(self.board, "|X", "| "):
             print("--" * self.width + "-")
-            for j in range(self.width):
-                if self.board[i][j]:
-                    print("|X", end="")
-                else:
-                    print("| ", end="")
-            print("|")
+            print("".join(row) + "|")
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
-        i, j = cell
-        return self.board[i][j]
+        return bool(self.board[cell])
 
     def nearby_mines(self, cell):
         """
@@ -59,23 +49,11 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        # Sum the window of cells within one row and column, clipped to the board,
+        # ignoring the cell itself
+        i, j = cell
+        window = self.board[max(i - 1, 0):i + 2, max(j - 1, 0):j + 2]
+        return int(window.sum()) - int(self.board[i, j])
 
     def won(self):
         """
@@ -98,6 +76,9 @@ class Sentence():
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    # sentences are mutated in place as cells are marked, so they cannot be hashed
+    __hash__ = None
+
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
@@ -107,7 +88,7 @@ class Sentence():
         """
         # a cell is known to be a mine if the length of the set is equal to the count
         if len(self.cells) <= self.count:
-            return self.cells
+            return self.cells.copy()
         else:
             return set()
 
@@ -117,7 +98,7 @@ class Sentence():
         """
         # a cell is known to be safe if the count is zero
         if self.count == 0:
-            return self.cells
+            return self.cells.copy()
         else:
             return set()
 
@@ -129,9 +110,7 @@ class Sentence():
         # marking a mine removes the cell from the set and decrements the count
         if cell in self.cells:
             self.count -= 1
-            cell_set = set()
-            cell_set.add(cell)
-            self.cells = self.cells.difference(cell_set)
+            self.cells.discard(cell)
 
     def mark_safe(self, cell):
         """
@@ -139,10 +118,7 @@ class Sentence():
         a cell is known to be safe.
         """
         # marking a mine as safe removes the cell from the set and doesn't affect the count
-        if cell in self.cells:
-            cell_set = set()
-            cell_set.add(cell)
-            self.cells = self.cells.difference(cell_set)
+        self.cells.discard(cell)
 
 
 class MinesweeperAI():
@@ -166,6 +142,19 @@ class MinesweeperAI():
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # All cells on the board, and the legal neighbors of each, computed once
+        self._all_cells = frozenset(
+            (i, j) for i in range(self.height) for j in range(self.width)
+        )
+        self._neighbors = dict()
+        for i, j in self._all_cells:
+            self._neighbors[i, j] = frozenset(
+                (i + di, j + dj)
+                for di in (-1, 0, 1) for dj in (-1, 0, 1)
+                if (di, dj) != (0, 0)
+                and 0 <= i + di < self.height and 0 <= j + dj < self.width
+            )
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
@@ -217,41 +206,66 @@ class MinesweeperAI():
         if len(neighbors) > 0:
             self.knowledge.append(Sentence(neighbors, count))
 
-        # loop over all sentences and check if we can make conclusions
+        # repeat until no new conclusions or sentences can be inferred
+        changed = True
+        while changed:
+            changed = False
+
+            # loop over all sentences and check if we can make conclusions
+            for sentence in self.knowledge:
+                # compute each conclusion once, as a snapshot that stays valid while cells are marked;
+                # safes only need checking if no mines are known
+                known_mines = sentence.known_mines()
+                known_safes = sentence.known_safes() if not known_mines else set()
+                # if we know all cells are mines, mark them all and add them to list
+                if known_mines:
+                    changed = True
+                    for mine in known_mines:
+                        self.mark_mine(mine)
+                # similar if we know all cells are safe
+                elif known_safes:
+                    changed = True
+                    for safe in known_safes:
+                        self.mark_safe(safe)
+
+            # drop sentences with no cells left, and record the rest for constant-time duplicate checks
+            self.knowledge = [sentence for sentence in self.knowledge if sentence.cells]
+            known = {(frozenset(sentence.cells), sentence.count) for sentence in self.knowledge}
+
+            # compare sentences smallest first, so only later sentences can be strict supersets
+            self.knowledge.sort(key=lambda sentence: len(sentence.cells))
+            new_sentences = []
+            for i, sentence in enumerate(self.knowledge):
+                for sentence2 in itertools.islice(self.knowledge, i + 1, None):
+                    if sentence.cells < sentence2.cells:
+                        # if we find a subset, add a new sentence with the count difference if it is not known yet
+                        cells = sentence2.cells.difference(sentence.cells)
+                        count = sentence2.count - sentence.count
+                        if (frozenset(cells), count) not in known:
+                            known.add((frozenset(cells), count))
+                            new_sentences.append(Sentence(cells, count))
+            if new_sentences:
+                changed = True
+                self.knowledge.extend(new_sentences)
+
+        # keep only sentences that still say something about undetermined cells, once each,
+        # so the knowledge base tracks the frontier rather than every move made so far
+        known_cells = self.safes | self.mines
+        seen = set()
+        knowledge = []
         for sentence in self.knowledge:
-            # if we know all cells are mines, mark them all and add them to list
-            if len(sentence.known_mines()) is not 0:
-                for mine in sentence.known_mines():
-                    self.mark_mine(mine)
-            # similar if we know all cells are safe
-            elif len(sentence.known_safes()) is not 0:
-                for safe in sentence.known_safes():
-                    self.mark_safe(safe)
-            # loop over all other sentences and compare to check for subsets
-            for sentence2 in self.knowledge:
-                if sentence.cells < sentence2.cells:
-                    # if we find a subset, add a new sentence with the count difference if it is not in knowledge yet
-                    new_sentence = Sentence(sentence2.cells.difference(sentence.cells), sentence2.count - sentence.count)
-                    if new_sentence not in self.knowledge:
-                        self.knowledge.append(new_sentence)
+            key = (frozenset(sentence.cells), sentence.count)
+            if sentence.cells and not sentence.cells <= known_cells and key not in seen:
+                seen.add(key)
+                knowledge.append(sentence)
+        self.knowledge = knowledge
 
     def get_neighbors(self, cell):
         """
         Gets all the legal neighbors surrounding a cell on the board
         """
-        # construct all neighbors based on combinations of i, j +/- 1
-        i, j = cell
-        h = Minesweeper().height
-        w = Minesweeper().width
-        neighbors = {(i - 1, j - 1), (i - 1, j), (i - 1, j + 1), (i, j - 1), (i, j + 1),
-                     (i + 1, j - 1), (i + 1, j), (i + 1, j + 1)}
-        legal = set()
-
-        # restrict output to those bounded by the board dimensions
-        for neighbor in neighbors:
-            if 0 <= neighbor[0] < h and 0 <= neighbor[1] < w:
-                legal.add(neighbor)
-        return legal
+        # neighbors are precomputed for the board dimensions in __init__
+        return self._neighbors[cell]
 
     def make_safe_move(self):
         """
@@ -267,8 +281,7 @@ class MinesweeperAI():
         if len(avail_moves) == 0:
             return None
         else:
-            move = random.sample(avail_moves, 1)[0]
-            return move
+            return self.random_cell(avail_moves)
 
     def make_random_move(self):
         """
@@ -277,17 +290,21 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        # construct all positions on board
-        h = Minesweeper().height
-        w = Minesweeper().width
-        moves = set()
-        for i in range(h):
-            for j in range(w):
-                moves.add((i, j))
-
-        # available moves are those that have not been made and are not known to be mines
-        avail_moves = moves.difference(self.moves_made).difference(self.mines)
+        # available moves are those on the board that have not been made and are not known to be mines
+        avail_moves = self._all_cells.difference(self.moves_made).difference(self.mines)
 
         # randomly choose one
-        move = random.sample(avail_moves, 1)[0]
-        return move
+        return self.random_cell(avail_moves)
+
+    @staticmethod
+    def random_cell(cells):
+        """
+        Returns a cell chosen uniformly at random from the set `cells`,
+        or None if it is empty.
+        """
+        # reservoir sampling with a reservoir of one: a single pass over the set, with no list built
+        pick = None
+        for i, cell in enumerate(cells):
+            if random.random() < 1 / (i + 1):
+                pick = cell
+        return pick
@@ -1,4 +1,6 @@
+import functools
 import os
+from collections import Counter
 import nltk
 import numpy as np
 import string
@@ -7,6 +9,8 @@ import sys
 FILE_MATCHES = 1
 SENTENCE_MATCHES = 1
 
+PUNCTUATION = frozenset(string.punctuation)
+
 
 def main():
 
@@ -66,21 +70,28 @@ def tokenize(document):
     Process document by coverting all words to lowercase, and removing any
     punctuation or English stopwords.
     """
-    # get lists of forbidden words/characters
-    punc = string.punctuation
-    stop = nltk.corpus.stopwords.words("english")
+    # get set of forbidden words
+    stop = stopwords()
     words = []
 
     # for each word in the document
     for word in nltk.word_tokenize(document.lower()):
-        # remove any words consisting of punctuation
-        if all(letter not in punc for letter in word):
+        # remove any words containing punctuation
+        if PUNCTUATION.isdisjoint(word):
             # remove stop words
             if word not in stop:
                 words.append(word)
     return words
 
 
+@functools.lru_cache(maxsize=None)
+def stopwords():
+    """
+    Return the set of English stopwords, loading it from the NLTK corpus on the first call only.
+    """
+    return frozenset(nltk.corpus.stopwords.words("english"))
+
+
 def compute_idfs(documents):
     """
     Given a dictionary of `documents` that maps names of documents to a list
@@ -89,20 +100,15 @@ def compute_idfs(documents):
     Any word that appears in at least one of the documents should be in the
     resulting dictionary.
     """
-    # get all unique words across all documents
-    words = list(set(sum(documents.values(), [])))
-    IDF = {}
-    for word in words:
-        n = 0
-        num_doc = len(documents)
-        # for each document
-        for document,text in documents.items():
-            # increment counter if word is in text of document
-            if word in text:
-                n += 1
-        # record IDF
-        IDF[word] = np.log(num_doc/n)
-    return IDF
+    # count the number of documents each word appears in, in a single pass over the documents
+    doc_freq = Counter()
+    for text in documents.values():
+        doc_freq.update(set(text))
+
+    # compute all IDFs at once
+    words = list(doc_freq.keys())
+    IDF = np.log(len(documents) / np.array(list(doc_freq.values()), dtype=float))
+    return dict(zip(words, IDF.tolist()))
 
 def top_files(query, files, idfs, n):
     """
@@ -111,20 +117,16 @@ def top_files(query, files, idfs, n):
     to their IDF values), return a list of the filenames of the the `n` top
     files that match the query, ranked according to tf-idf.
     """
-    filenames = []
-    TFIDF = []
+    filenames = list(files.keys())
+    TFIDF = np.zeros(len(filenames))
     # iterate through each file
-    for file, text in files.items():
-        sum = 0
+    for i, file in enumerate(filenames):
+        # count every word of the file once, rather than rescanning the file for each query word
+        counts = Counter(files[file])
         # for each word in query, add IDF * word frequency if word is present in dictionary
-        for word in query:
-            if word in idfs.keys():
-                sum += idfs[word] * text.count(word)
-        filenames.append(file)
-        TFIDF.append(sum)
-    # sort list of tuples containing filename and TFIDF and extract filenames
-    sorted_names = [f for f,_ in sorted(zip(filenames, TFIDF), key=lambda x: x[1], reverse=True)]
-    return sorted_names[:n]
+        TFIDF[i] = sum(idfs[word] * counts[word] for word in query if word in idfs)
+    # return the top n filenames by TFIDF
+    return [filenames[i] for i in top_indices(TFIDF, n)]
 
 
 def top_sentences(query, sentences, idfs, n):
@@ -135,69 +137,38 @@ def top_sentences(query, sentences, idfs, n):
     the query, ranked according to idf. If there are ties, preference should
     be given to sentences that have a higher query term density.
     """
-    sentence_list = []
-    IDF = []
+    names = list(sentences.keys())
+    IDF = np.zeros(len(names))
+    QTD = np.zeros(len(names))
     # iterate through each sentence in the document
-    for sentence, text in sentences.items():
-        sum = 0
+    for i, sentence in enumerate(names):
+        text = sentences[sentence]
+        words = set(text)
         # for each word in query, add its IDF to the sum if it is in the text and the dictionary of words
-        for word in query:
-            if word in idfs.keys() and word in text:
-                sum += idfs[word]
-        sentence_list.append(sentence)
-        IDF.append(sum)
-    # sort tuples of sentence identifiers and IDF sums
-    sorted_names = sorted(zip(sentence_list, IDF), key=lambda x: x[1], reverse=True)
-
-    # check to make sure IDF of each of top n elements is unique
-    IDF = sorted(IDF, reverse=True)
-    for i in range(n):
-        if IDF.count(IDF[i]) != 1:
-            # if not, sort list query term density
-            sorted_names = QTD_sort(IDF, sorted_names, sentences, query)
-            break
-    # extract sentence identifiers and return top n
-    names = [s for s, _ in sorted_names]
-    return names[:n]
-
-
-def QTD_sort(IDF, sorted_names, sentences, query):
+        IDF[i] = sum(idfs[word] for word in query if word in idfs and word in words)
+        # query term density: the number of query words in the sentence, divided by the sentence length
+        QTD[i] = sum(1 for word in query if word in words) / len(text)
+    # return the top n sentence identifiers by IDF sum, breaking ties by query term density
+    return [names[i] for i in top_indices(IDF, n, QTD)]
+
+
+def top_indices(scores, n, ties=None):
     """
-    This function is called if multiple sentences have the same IDF sum and calculates the query term density (QTD) of
-    each sentence in the document. For sentences with overlapping IDFs, the function sorts their QTDs and rearranges
-    the sorted_names list accordingly.
+    Return the indices of the `n` highest `scores`, best first. Equal scores
+    are ordered by higher `ties` (if given), then by position.
     """
-    # for each unique IDF
-    for item in list(set(IDF)):
-        # if it is repeated
-        if IDF.count(item) > 1:
-            QTD = []
-            positions = []
-            i = 0
-            # check each tuple in sorted_names, and if a given sentence has the IDF of interest,
-            for name in sorted_names:
-                if name[1] == item:
-                    # record its position in the tuple
-                    positions.append(i)
-                    sentence = sentences[name[0]]
-                    sum = 0
-                    # calculate the number of words in the query which appear in the sentence
-                    for word in query:
-                        if word in sentence:
-                            sum += 1
-                    # divide by the sentence length to get the QTD
-                    QTD.append(sum/len(sentence))
-                i += 1
-            # use np.argsort to get indices which correspond to the sorted QTD list
-            sorted_QTD = list(np.argsort(QTD))
-            sorted_QTD.reverse()
-            sorted_cpy = sorted_names.copy()
-
-            # for each position which has the duplicate IDF
-            for i in range(len(positions)):
-                # switch the entry with that indicated by the sorted QTD list
-                sorted_names[positions[i]] = sorted_cpy[positions[sorted_QTD[i]]]
-    return sorted_names
+    n = min(n, len(scores))
+    if n <= 0:
+        return []
+    # find the n-th highest score in linear time and keep everything at least that good,
+    # so entries tied at the cutoff are all considered before sorting just the candidates
+    cutoff = np.partition(scores, len(scores) - n)[len(scores) - n]
+    candidates = np.flatnonzero(scores >= cutoff)
+    if ties is None:
+        order = np.lexsort((candidates, -scores[candidates]))
+    else:
+        order = np.lexsort((candidates, -ties[candidates], -scores[candidates]))
+    return candidates[order[:n]]
 
 
 if __name__ == "__main__":
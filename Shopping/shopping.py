@@ -1,10 +1,13 @@
-import csv
 import sys
 
+import numpy as np
+import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.neighbors import KNeighborsClassifier
 
 TEST_SIZE = 0.4
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'June', 'Jul', 'Aug',
+          'Sep', 'Oct', 'Nov', 'Dec']
 
 
 def main():
@@ -59,44 +62,18 @@ def load_data(filename):
     labels should be the corresponding list of labels, where each label
     is 1 if Revenue is true, and 0 otherwise.
     """
-    evidence = []
-    labels = []
-
-    # iterate through csv file
-    with open(filename) as csvfile:
-        reader = csv.reader(csvfile)
-        # first row is headers
-        header = next(reader)
-        # lists of format requirements
-        integers = ['Administrative', 'Informational', 'ProductRelated',
-                   'OperatingSystems', 'Browser', 'Region', 'TrafficType']
-        floats = ['Administrative_Duration', 'Informational_Duration',
-                  'ProductRelated_Duration', 'BounceRates', 'ExitRates',
-                  'PageValues', 'SpecialDay']
-        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'June', 'Jul', 'Aug',
-                  'Sep', 'Oct', 'Nov', 'Dec']
-        # for each row
-        for row in reader:
-            # take all columns but label
-            ev = row[:-1]
-            ev_mod = []
-            # make current entry conform to format based on its column name and the above lists
-            for i in range(len(ev)):
-                item = ev[i]
-                if header[i] in integers:
-                    ev_mod.append(int(item))
-                elif header[i] in floats:
-                    ev_mod.append(float(item))
-                elif header[i] == 'VisitorType':
-                    ev_mod.append(1 if item == 'Returning_Visitor' else 0)
-                elif header[i] == 'Weekend':
-                    ev_mod.append(1 if item == 'TRUE' else 0)
-                else:
-                    ev_mod.append(months.index(item))
-            # append modified evidence and labels
-            evidence.append(ev_mod)
-            labels.append(1 if row[-1] == 'TRUE' else 0)
-    return (evidence, labels)
+    # read csv file, with whole columns converted to numbers at once rather than cell by cell
+    # (integer and floating point columns are parsed as such; TRUE/FALSE columns as booleans)
+    data = pd.read_csv(filename, true_values=['TRUE'], false_values=['FALSE'])
+    data['Month'] = pd.Categorical(data['Month'], categories=MONTHS).codes.astype(np.int64)
+    data['VisitorType'] = (data['VisitorType'] == 'Returning_Visitor').astype(np.int64)
+    data['Weekend'] = data['Weekend'].astype(np.int64)
+    labels = data.pop('Revenue').astype(np.int64)
+
+    # take all columns but label, keeping each column's own type
+    evidence = data.to_numpy(dtype=object).tolist()
+    return (evidence, labels.tolist())
+
 
 def train_model(evidence, labels):
     """
@@ -124,23 +101,13 @@ def evaluate(labels, predictions):
     representing the "true negative rate": the proportion of
     actual negative labels that were accurately identified.
     """
-    # true and false positives and negatives
-    TP = 0
-    TN = 0
-    FN = 0
-    FP = 0
-    # iterate through each label-prediction combination and increment correct counter
-    for label, prediction in zip(labels, predictions):
-        if label == 1:
-            if prediction == 1:
-                TP += 1
-            else:
-                FN += 1
-        else:
-            if prediction == 0:
-                TN += 1
-            else:
-                FP += 1
+    # count true and false positives and negatives with boolean masks over all label-prediction pairs at once
+    actual = np.asarray(labels).astype(bool)
+    predicted = np.asarray(predictions).astype(bool)
+    TP = int((actual & predicted).sum())
+    FN = int((actual & ~predicted).sum())
+    TN = int((~actual & ~predicted).sum())
+    FP = int((~actual & predicted).sum())
     # calculate fit parameters
     sensitivity = TP / (TP + FN)
     specificity = TN / (TN + FP)
@@ -2,14 +2,24 @@
 Tic Tac Toe Player
 """
 
+import functools
 import math
 
-from copy import deepcopy
-
 X = "X"
 O = "O"
 EMPTY = None
 
+# During search, a board is a pair of 9-bit masks (x, o) of the cells held by each player,
+# where bit 3 * i + j stands for cell (i, j)
+FULL_MASK = 0o777
+# Masks of the eight winning lines: rows, columns and diagonals
+WIN_MASKS = (0o007, 0o070, 0o700, 0o111, 0o222, 0o444, 0o421, 0o124)
+# Whether each of the 512 possible masks covers a whole winning line, computed once
+COMPLETES_LINE = tuple(
+    any(mask & line == line for line in WIN_MASKS)
+    for mask in range(FULL_MASK + 1)
+)
+
 
 def initial_state():
     """
@@ -24,37 +34,22 @@ def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    numX = 0
-    numO = 0
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == X:
-                numX += 1
-            elif board[i][j] == O:
-                numO += 1
-    if numX > numO:
-        return O
-    else:
-        return X
+    return mask_player(*encode(board))
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    moves = set()
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                moves.add((i, j))
-    return moves
+    return {(k // 3, k % 3) for k in mask_actions(*encode(board))}
 
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    newboard = deepcopy(board)
+    # copy each row; the cells themselves are immutable, so no deep copy is needed
+    newboard = [row[:] for row in board]
     i = action[0]
     j = action[1]
     if board[i][j] == EMPTY:
@@ -68,93 +63,169 @@ def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    for i in range(3):
-        if board[i][0] == board[i][1] and board[i][1] == board[i][2] and board[i][0] is not None:
-            return board[i][0]
-        elif board[0][i] == board[1][i] and board[1][i] == board[2][i] and board[0][i] is not None:
-            return board[0][i]
-    if board[0][0] == board[1][1] and board[1][1] == board[2][2] and board[0][0] is not None:
-        return board[0][0]
-    elif board[2][0] == board[1][1] and board[1][1] == board[0][2] and board[2][0] is not None:
-        return board[2][0]
-    else:
-        return None
+    return mask_winner(*encode(board))
 
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None:
-        return True
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                return False
-    else:
-        return True
+    return mask_terminal(*encode(board))
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X:
+    return mask_utility(*encode(board))
+
+
+def encode(board):
+    """
+    Returns the board as a pair of bitmasks (x, o) of the cells held by X and O.
+    """
+    x = 0
+    o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def mask_player(x, o):
+    """
+    Returns player who has the next turn on a board given as bitmasks.
+    """
+    # X moves whenever both players have made the same number of moves
+    return X if bin(x).count("1") == bin(o).count("1") else O
+
+
+def mask_actions(x, o):
+    """
+    Yields the bit index 3 * i + j of each empty cell on a board given as bitmasks.
+    """
+    empty = FULL_MASK & ~(x | o)
+    while empty:
+        # isolate the lowest set bit, yield its index, and clear it
+        bit = empty & -empty
+        yield bit.bit_length() - 1
+        empty ^= bit
+
+
+def mask_winner(x, o):
+    """
+    Returns the winner of the game on a board given as bitmasks, if there is one.
+    """
+    if COMPLETES_LINE[x]:
+        return X
+    if COMPLETES_LINE[o]:
+        return O
+    return None
+
+
+def mask_terminal(x, o):
+    """
+    Returns True if game is over on a board given as bitmasks, False otherwise.
+    """
+    return (x | o) == FULL_MASK or mask_winner(x, o) is not None
+
+
+def mask_utility(x, o):
+    """
+    Returns 1 if X has won the game on a board given as bitmasks, -1 if O has won, 0 otherwise.
+    """
+    win = mask_winner(x, o)
+    if win == X:
         return 1
-    elif winner(board) == O:
+    elif win == O:
         return -1
     else:
         return 0
 
 
+def mask_value(x, o):
+    """
+    Returns the utility of a board given as bitmasks if the game is over, None otherwise.
+    (Combines mask_terminal and mask_utility, checking for a winner only once.)
+    """
+    if COMPLETES_LINE[x]:
+        return 1
+    if COMPLETES_LINE[o]:
+        return -1
+    if (x | o) == FULL_MASK:
+        return 0
+    return None
+
+
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
     """
-    if player(board) == X:
-        # choose action that produces highest value of Min-Value(Result(s,a))
+    x, o = encode(board)
+    if mask_player(x, o) == X:
+        # choose action that produces highest value of Min-Value(Result(s,a)),
+        # using the best value so far as the lower bound alpha
         v = -2
-        acts = actions(board)
-        for act in acts:
-            v_act = Min_Value(result(board, act), v)
+        for k in mask_actions(x, o):
+            v_act = Min_Value(x | 1 << k, o, v, 2)
             if v_act > v:
-                act_opt = act
+                act_opt = k
                 v = v_act
 
-        return act_opt
-
     else:
-        # choose action that produces the smallest value of Max-Value(Result(s,a))
+        # choose action that produces the smallest value of Max-Value(Result(s,a)),
+        # using the best value so far as the upper bound beta
         v = 2
-        acts = actions(board)
-        for act in acts:
-            v_act = Max_Value(result(board, act), v)
+        for k in mask_actions(x, o):
+            v_act = Max_Value(x, o | 1 << k, -2, v)
             if v_act < v:
-                act_opt = act
+                act_opt = k
                 v = v_act
 
-        return act_opt
-
-
-def Min_Value(board, v):
-    if terminal(board):
-        return utility(board)
-    v_list = list()
-    for action in actions(board):
-        v_list.append(Max_Value(result(board, action), v))
-        if v_list[-1] < v:
-            return v_list[-1]
-    return min(v_list)
-
-
-
-def Max_Value(board, v):
-    if terminal(board):
-        return utility(board)
-    v_list = list()
-    for action in actions(board):
-        v_list.append(Min_Value(result(board, action), v))
-        if v_list[-1] > v:
-            return v_list[-1]
-    return max(v_list)
-
+    return act_opt // 3, act_opt % 3
+
+
+# Positions are reached again through different move orders, so both searches are memoized.
+# The bounds are part of the cache key, so a value cut off under one window is never reused
+# under another; with at most five distinct bounds the table stays small.
+@functools.lru_cache(maxsize=None)
+def Min_Value(x, o, alpha, beta):
+    """
+    Returns the value of the board for O to move, searched with alpha-beta pruning:
+    alpha is the best value X can already guarantee, beta the best O can.
+    """
+    value = mask_value(x, o)
+    if value is not None:
+        return value
+    v = 2
+    # O to move
+    for k in mask_actions(x, o):
+        v = min(v, Max_Value(x, o | 1 << k, alpha, beta))
+        # X will never allow this board, so stop searching it
+        if v <= alpha:
+            return v
+        beta = min(beta, v)
+    return v
+
+
+@functools.lru_cache(maxsize=None)
+def Max_Value(x, o, alpha, beta):
+    """
+    Returns the value of the board for X to move, searched with alpha-beta pruning:
+    alpha is the best value X can already guarantee, beta the best O can.
+    """
+    value = mask_value(x, o)
+    if value is not None:
+        return value
+    v = -2
+    # X to move
+    for k in mask_actions(x, o):
+        v = max(v, Min_Value(x | 1 << k, o, alpha, beta))
+        # O will never allow this board, so stop searching it
+        if v >= beta:
+            return v
+        alpha = max(alpha, v)
+    return v